@@ -1,20 +1,47 @@
 import sqlite3
 import datetime
+import math
+import threading
+from collections import deque
 from typing import Dict, List, Tuple
-from faker import Faker
 import hashlib
 
 
+# Operations whose changes are committed instead of returning rows
+_WRITE_OPERATIONS = frozenset({'INSERT', 'UPDATE', 'DELETE'})
+
+# Administrator alert banner, filled in from a log entry
+_ALERT_TEMPLATE = (
+    "\n" + "=" * 70 + "\n"
+    "🚨 SECURITY ALERT - UNAUTHORIZED DATABASE ACCESS DETECTED 🚨\n"
+    + "=" * 70 + "\n"
+    "Timestamp:    {timestamp}\n"
+    "Application:  {app_id}\n"
+    "IP Address:   {ip_address}\n"
+    "Operation:    {operation}\n"
+    "Query:        {query}\n"
+    "Params:       {params}\n"
+    "Action Taken: {action}\n"
+    + "=" * 70 + "\n"
+)
+
+
 class DatabaseFirewall:
     """Main firewall class that intercepts and validates database access"""
 
     def __init__(self, real_db_path: str = "real_database.db",
-        honeypot_db_path: str = "honeypot_database.db"):
+        honeypot_db_path: str = "honeypot_database.db",
+        max_log_entries: int = 100_000, alerts_enabled: bool = True):
         self.real_db_path = real_db_path
         self.honeypot_db_path = honeypot_db_path
-        self.fake = Faker()
-        self.access_log = []
+        self.fake = None  # Faker instance, created on first honeypot population
+        self.access_log = deque(maxlen=max_log_entries)  # Oldest entries are dropped first
+        self.alerts_enabled = alerts_enabled  # Print an alert banner per intrusion
         self.authorized_schedule = {}  # Format: {app_id: [(start_time, end_time)]}
+        self._hour_masks = {}  # Format: {app_id: bitmap with bit h set if hour h is authorized}
+        self._local = threading.local()  # Per-thread cached database connections
+        self._honeypot_stale = True  # Honeypot needs (re)populating before its next query
+        self._honeypot_lock = threading.Lock()  # Guards _honeypot_stale and repopulation
 
         # Initialize databases
         self._init_real_database()
@@ -23,35 +50,43 @@ class DatabaseFirewall:
     def _init_real_database(self):
         """Initialize the real database with sample data"""
         conn = sqlite3.connect(self.real_db_path)
-        cursor = conn.cursor()
+        conn.execute("PRAGMA journal_mode=WAL")  # Persists in the database file
+        # Seeding is a throwaway bulk load, so skip fsyncs on this connection
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA temp_store=MEMORY")
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                username TEXT,
-                email TEXT,
-                password TEXT,
-                balance REAL
-            )
-        ''')
+        # Reseed in one transaction, committed once when the block exits
+        with conn:
+            cursor = conn.cursor()
 
-        # Insert sample real data
-        cursor.execute("DELETE FROM users")
-        cursor.executemany('''
-            INSERT INTO users (username, email, password, balance) 
-            VALUES (?, ?, ?, ?)
-        ''', [
-            ('admin', 'admin@company.com', 'hashed_password_1', 50000.00),
-            ('john_doe', 'john@company.com', 'hashed_password_2', 25000.00),
-            ('jane_smith', 'jane@company.com', 'hashed_password_3', 30000.00)
-        ])
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY,
+                    username TEXT,
+                    email TEXT,
+                    password TEXT,
+                    balance REAL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)")
+
+            # Insert sample real data
+            cursor.execute("DELETE FROM users")
+            cursor.executemany('''
+                INSERT INTO users (username, email, password, balance) 
+                VALUES (?, ?, ?, ?)
+            ''', [
+                ('admin', 'admin@company.com', 'hashed_password_1', 50000.00),
+                ('john_doe', 'john@company.com', 'hashed_password_2', 25000.00),
+                ('jane_smith', 'jane@company.com', 'hashed_password_3', 30000.00)
+            ])
 
-        conn.commit()
         conn.close()
 
     def _init_honeypot_database(self):
         """Initialize honeypot database with same schema"""
         conn = sqlite3.connect(self.honeypot_db_path)
+        conn.execute("PRAGMA journal_mode=WAL")  # Persists in the database file
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -63,62 +98,117 @@ class DatabaseFirewall:
                 balance REAL
             )
         ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)")
 
         conn.commit()
         conn.close()
 
+    def _get_connection(self, db_path: str) -> sqlite3.Connection:
+        """Return this thread's cached connection to the given database"""
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        conn = connections.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(db_path)
+            # journal_mode=WAL is already stored in the file by the _init_* methods
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-20000")
+            conn.execute("PRAGMA mmap_size=268435456")  # Serve page reads from memory-mapped I/O
+            connections[db_path] = conn
+        return conn
+
+    @staticmethod
+    def _run_query(conn: sqlite3.Connection, operation: str, query: str,
+                   params: Tuple) -> List:
+        """Run a query on a cached connection, committing write operations"""
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+
+            if operation.upper() in _WRITE_OPERATIONS:
+                conn.commit()
+                results = []
+            else:
+                results = cursor.fetchall()
+        finally:
+            # Drop uncommitted changes, even after a failed statement,
+            # as closing the connection used to
+            if conn.in_transaction:
+                conn.rollback()
+        return results
+
     def register_authorized_access(self, app_id: str, time_windows: List[Tuple[int, int]]):
         """
         Register authorized time windows for an application
         time_windows: List of (start_hour, end_hour) tuples in 24-hour format
+        Schedule changes must go through this method or revoke_authorized_access,
+        since the authorized hours are precomputed here
         """
         self.authorized_schedule[app_id] = time_windows
+        self._hour_masks[app_id] = self._build_hour_mask(time_windows)
+
+    def revoke_authorized_access(self, app_id: str):
+        """Remove all authorized time windows for an application"""
+        self.authorized_schedule.pop(app_id, None)
+        self._hour_masks.pop(app_id, None)
+
+    @staticmethod
+    def _build_hour_mask(time_windows: List[Tuple[int, int]]) -> int:
+        """Return a bitmap with bit h set if hour h falls in any time window"""
+        mask = 0
+        for start_hour, end_hour in time_windows:
+            if not start_hour < end_hour:
+                continue  # Empty window (also skips NaN bounds)
+            # Clamp to the day first, then round up: for whole hours,
+            # start <= h < end is the same as ceil(start) <= h < ceil(end)
+            first_hour = math.ceil(max(start_hour, 0))
+            last_hour = math.ceil(min(end_hour, 24))
+            for hour in range(first_hour, last_hour):
+                mask |= 1 << hour
+        return mask
 
     def _is_access_authorized(self, app_id: str, current_time: datetime.datetime) -> bool:
         """Check if the application is authorized to access at current time"""
         if app_id not in self.authorized_schedule:
             return False
 
-        current_hour = current_time.hour
-
-        for start_hour, end_hour in self.authorized_schedule[app_id]:
-            if start_hour <= current_hour < end_hour:
-                return True
-
-        return False
+        return bool((self._hour_masks.get(app_id, 0) >> current_time.hour) & 1)
 
     def _generate_fake_data(self, num_records: int = 3) -> List[Tuple]:
         """Generate realistic fake data for the honeypot"""
-        fake_data = []
-        for i in range(1, num_records + 1):
-            fake_data.append((
-                i,
-                self.fake.user_name(),
-                self.fake.email(),
-                hashlib.md5(self.fake.password().encode()).hexdigest(),
-                round(self.fake.random.uniform(1000, 10000), 2)
-            ))
-        return fake_data
-
-    def _populate_honeypot(self, operation: str, query: str):
-        """Populate honeypot with fake data based on the operation"""
-        conn = sqlite3.connect(self.honeypot_db_path)
-        cursor = conn.cursor()
-
-        # Clear and populate with fake data
-        cursor.execute("DELETE FROM users")
+        if self.fake is None:
+            # Faker is slow to import, so only load it once a honeypot is needed
+            from faker import Faker
+            self.fake = Faker()
+
+        # Bind the providers once instead of resolving them through Faker per row
+        user_name, email = self.fake.user_name, self.fake.email
+        password, uniform = self.fake.password, self.fake.random.uniform
+
+        return [
+            (i, user_name(), email(), hashlib.md5(password().encode()).hexdigest(),
+             round(uniform(1000, 10000), 2))
+            for i in range(1, num_records + 1)
+        ]
+
+    def _populate_honeypot(self):
+        """Replace the honeypot contents with a fresh set of fake data"""
+        conn = self._get_connection(self.honeypot_db_path)
         fake_data = self._generate_fake_data()
 
-        cursor.executemany('''
-            INSERT INTO users (id, username, email, password, balance) 
-            VALUES (?, ?, ?, ?, ?)
-        ''', fake_data)
-
-        conn.commit()
-        conn.close()
+        # Clear and populate with fake data, rolling back if either step fails
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM users")
+            cursor.executemany('''
+                INSERT INTO users (id, username, email, password, balance) 
+                VALUES (?, ?, ?, ?, ?)
+            ''', fake_data)
 
     def _log_intrusion(self, app_id: str, ip_address: str, operation: str,
-                       query: str, timestamp: datetime.datetime):
+                       query: str, params: Tuple, timestamp: datetime.datetime):
         """Log unauthorized access attempt"""
         log_entry = {
             'timestamp': timestamp.isoformat(),
@@ -126,32 +216,26 @@ class DatabaseFirewall:
             'ip_address': ip_address,
             'operation': operation,
             'query': query,
+            'params': params,
             'action': 'REDIRECTED_TO_HONEYPOT'
         }
 
         self.access_log.append(log_entry)
 
         # In real implementation, this would send email/SMS
-        self._send_alert(log_entry)
+        if self.alerts_enabled:
+            self._send_alert(log_entry)
 
     @staticmethod
     def _send_alert(log_entry: Dict):
         """Send alert to administrator (simulated)"""
-        print("\n" + "=" * 70)
-        print("🚨 SECURITY ALERT - UNAUTHORIZED DATABASE ACCESS DETECTED 🚨")
-        print("=" * 70)
-        print(f"Timestamp:    {log_entry['timestamp']}")
-        print(f"Application:  {log_entry['app_id']}")
-        print(f"IP Address:   {log_entry['ip_address']}")
-        print(f"Operation:    {log_entry['operation']}")
-        print(f"Query:        {log_entry['query']}")
-        print(f"Action Taken: {log_entry['action']}")
-        print("=" * 70 + "\n")
+        print(_ALERT_TEMPLATE.format_map(log_entry))
 
     def execute_query(self, app_id: str, ip_address: str, operation: str,
-                      query: str) -> Tuple[bool, List]:
+                      query: str, params: Tuple = ()) -> Tuple[bool, List]:
         """
         Main method to execute database queries through the firewall
+        params: Values bound to the query's ? placeholders
         Returns: (is_authorized, results)
         """
         current_time = datetime.datetime.now()
@@ -161,43 +245,79 @@ class DatabaseFirewall:
 
         if is_authorized:
             # Execute on real database
-            conn = sqlite3.connect(self.real_db_path)
-            cursor = conn.cursor()
-            cursor.execute(query)
-
-            if operation.upper() in ['INSERT', 'UPDATE', 'DELETE']:
-                conn.commit()
-                results = []
-            else:
-                results = cursor.fetchall()
-
-            conn.close()
+            conn = self._get_connection(self.real_db_path)
+            results = self._run_query(conn, operation, query, params)
             print(f"✅ Authorized access: {app_id} executed query on REAL database")
             return True, results
 
         else:
             # Redirect to honeypot
-            self._log_intrusion(app_id, ip_address, operation, query, current_time)
-            self._populate_honeypot(operation, query)
+            self._log_intrusion(app_id, ip_address, operation, query, params, current_time)
+            # Keep the same decoy rows across queries until one modifies them
+            with self._honeypot_lock:
+                if self._honeypot_stale:
+                    self._populate_honeypot()
+                    self._honeypot_stale = False
 
             # Execute on honeypot database
-            conn = sqlite3.connect(self.honeypot_db_path)
-            cursor = conn.cursor()
-            cursor.execute(query)
-
-            if operation.upper() in ['INSERT', 'UPDATE', 'DELETE']:
-                conn.commit()
-                results = []
-            else:
-                results = cursor.fetchall()
-
-            conn.close()
+            conn = self._get_connection(self.honeypot_db_path)
+            results = self._run_query(conn, operation, query, params)
+            if operation.upper() in _WRITE_OPERATIONS:
+                # Set only after the write has committed, so a repopulation
+                # running concurrently cannot clear the flag and hide it
+                with self._honeypot_lock:
+                    self._honeypot_stale = True
             print(f"❌ Unauthorized access: {app_id} redirected to HONEYPOT database")
             return False, results
 
     def get_access_logs(self) -> List[Dict]:
-        """Retrieve all access logs"""
-        return self.access_log
+        """Retrieve all retained access logs, oldest first"""
+        return list(self.access_log)
+
+    def close(self):
+        """Close the calling thread's cached database connections"""
+        connections = getattr(self._local, 'connections', None)
+        if connections:
+            for conn in connections.values():
+                conn.close()
+            connections.clear()
+
+
+# Demo access attempts: a title for the printout plus the execute_query arguments
+SIMULATIONS = (
+    {
+        'title': "Authorized Access (within time window)",
+        'app_id': 'legitimate_app',
+        'ip_address': '192.168.1.100',
+        'operation': 'SELECT',
+        'query': 'SELECT * FROM users',
+        'params': ()
+    },
+    {
+        'title': "Unauthorized Access (outside time window)",
+        'app_id': 'legitimate_app',  # Same app but outside time window
+        'ip_address': '192.168.1.100',
+        'operation': 'SELECT',
+        'query': 'SELECT * FROM users WHERE username = ?',
+        'params': ('admin',)
+    },
+    {
+        'title': "Unknown Application",
+        'app_id': 'unknown_malicious_app',
+        'ip_address': '203.0.113.42',  # Suspicious external IP
+        'operation': 'SELECT',
+        'query': 'SELECT password FROM users',
+        'params': ()
+    },
+    {
+        'title': "SQL Injection Attempt",
+        'app_id': 'hacker_tool',
+        'ip_address': '198.51.100.23',
+        'operation': 'SELECT',
+        'query': "SELECT * FROM users WHERE username='' OR '1'='1'",
+        'params': ()
+    },
+)
 
 
 # Example usage demonstration
@@ -217,41 +337,19 @@ if __name__ == "__main__":
     print("- backup_service: 2:00 AM - 4:00 AM\n")
 
     # Simulate different access attempts
-    print("\n--- SIMULATION 1: Authorized Access (within time window) ---")
-    authorized, results = firewall.execute_query(
-        app_id='legitimate_app',
-        ip_address='192.168.1.100',
-        operation='SELECT',
-        query='SELECT * FROM users'
-    )
-    print(f"Results: {results}\n")
-
-    print("\n--- SIMULATION 2: Unauthorized Access (outside time window) ---")
-    unauthorized, results = firewall.execute_query(
-        app_id='legitimate_app',  # Same app but outside time window
-        ip_address='192.168.1.100',
-        operation='SELECT',
-        query='SELECT * FROM users WHERE username="admin"'
-    )
-    print(f"Results (from honeypot): {results}\n")
-
-    print("\n--- SIMULATION 3: Unknown Application ---")
-    malicious, results = firewall.execute_query(
-        app_id='unknown_malicious_app',
-        ip_address='203.0.113.42',  # Suspicious external IP
-        operation='SELECT',
-        query='SELECT password FROM users'
-    )
-    print(f"Results (from honeypot): {results}\n")
-
-    print("\n--- SIMULATION 4: SQL Injection Attempt ---")
-    injection, results = firewall.execute_query(
-        app_id='hacker_tool',
-        ip_address='198.51.100.23',
-        operation='SELECT',
-        query="SELECT * FROM users WHERE username='' OR '1'='1'"
-    )
-    print(f"Results (from honeypot): {results}\n")
+    for i, simulation in enumerate(SIMULATIONS, 1):
+        print(f"\n--- SIMULATION {i}: {simulation['title']} ---")
+        authorized, results = firewall.execute_query(
+            app_id=simulation['app_id'],
+            ip_address=simulation['ip_address'],
+            operation=simulation['operation'],
+            query=simulation['query'],
+            params=simulation['params']
+        )
+        if authorized:
+            print(f"Results: {results}\n")
+        else:
+            print(f"Results (from honeypot): {results}\n")
 
     # Display all logged intrusions
     print("\n" + "=" * 70)
@@ -262,4 +360,5 @@ if __name__ == "__main__":
     for i, log in enumerate(logs, 1):
         print(f"\n[{i}] {log['timestamp']}")
         print(f"    App: {log['app_id']} | IP: {log['ip_address']}")
-        print(f"    Query: {log['query']}")
\ No newline at end of file
+        print(f"    Query: {log['query']}")
+        print(f"    Params: {log['params']}")
\ No newline at end of file